@@ -0,0 +1,76 @@
+"""
+Measure the cold-start time of importing book_analysis in a fresh interpreter.
+
+Usage:
+    python benchmarks/import_time.py [--repeat N]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+STATEMENTS = [
+    "pass",
+    "import book_analysis",
+    "from book_analysis import read_toc",
+    "from book_analysis import analyze_book",
+]
+
+
+def cold_start(statement: str, repeat: int) -> list[float]:
+    """
+    Time a statement in a fresh interpreter, including interpreter startup.
+
+    Parameters
+    ----------
+    statement: str
+        Python statement to run
+    repeat: int
+        Number of interpreters to start
+
+    Returns
+    -------
+    List of wall-clock times in seconds
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", statement], check=True)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def loads_nltk(statement: str) -> bool:
+    """
+    Check whether a statement imports nltk.
+    """
+    code = f"import sys\n{statement}\nprint('nltk' in sys.modules)"
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    return output.strip() == "True"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'statement':<42}{'median (ms)':>12}{'min (ms)':>10}  nltk")
+    for statement in STATEMENTS:
+        try:
+            timings = cold_start(statement, args.repeat)
+            nltk = loads_nltk(statement)
+        except subprocess.CalledProcessError:
+            print(f"{statement:<42}{'failed':>12}")
+            continue
+        print(
+            f"{statement:<42}{statistics.median(timings) * 1000:>12.1f}"
+            f"{min(timings) * 1000:>10.1f}  {'yes' if nltk else 'no'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,32 @@
-from .toc import read_toc
-from .nlp import analyze_book, sentence_metrics
+import importlib
+
+# Public names mapped to the submodule that defines them. Submodules are only
+# imported on first attribute access so that, e.g., reading a table of contents
+# does not pull in nltk.
+_LAZY_ATTRIBUTES = {
+    "read_toc": "toc",
+    "analyze_book": "nlp",
+    "sentence_metrics": "nlp",
+    "diff_toc": "diff",
+    "apply_diff": "diff",
+}
+_SUBMODULES = {"cli", "defaults", "diff", "nlp", "parser", "toc", "traversal"}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTRIBUTES:
+        module = importlib.import_module(f".{_LAZY_ATTRIBUTES[name]}", __name__)
+        value = getattr(module, name)
+    elif name in _SUBMODULES:
+        value = importlib.import_module(f".{name}", __name__)
+    else:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    # Cache the result so later lookups skip __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__) | _SUBMODULES)
@@ -0,0 +1,348 @@
+from __future__ import annotations
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+import argparse
+import json
+import os
+import sys
+import time
+
+
+def _book_id(path: str) -> str:
+    # "<name>.toc.txt" and "<name>.txt" both belong to the book "<name>"
+    name = Path(path).name
+    if name.endswith(".toc.txt"):
+        return name[: -len(".toc.txt")]
+    return Path(path).stem
+
+
+def discover_books(source: str) -> list[dict]:
+    """
+    Build the list of jobs to run from a directory or a manifest file.
+
+    A directory is scanned for TXT files. Each "<name>.txt" file is analyzed as a book and
+    a matching "<name>.toc.txt" file, if present, is parsed as its table of contents.
+    A manifest is a JSON Lines file with one object per book containing the keys
+    "id" (optional), "text" (optional), "toc" (optional), "title" (optional) and
+    "top_level" (optional). Relative paths are resolved against the manifest's directory.
+
+    Parameters
+    ----------
+    source: str
+        Path to a directory or a JSON Lines manifest
+
+    Returns
+    -------
+    List of jobs, each a dictionary with the keys "id", "text", "toc", "title" and "top_level"
+
+    Raises
+    ------
+    ValueError
+        If a manifest line is not a JSON object with a path, or two books share an ID
+    OSError
+        If the manifest cannot be read
+    """
+    source = Path(source)
+    jobs = []
+    if source.is_dir():
+        for path in sorted(source.glob("*.txt")):
+            if path.name.endswith(".toc.txt"):
+                continue
+            toc = path.with_name(path.stem + ".toc.txt")
+            jobs.append(
+                {
+                    "id": _book_id(path),
+                    "text": str(path),
+                    "toc": str(toc) if toc.exists() else None,
+                    "title": path.stem,
+                    "top_level": True,
+                }
+            )
+        # Tables of contents without a matching book are still parsed
+        for toc in sorted(source.glob("*.toc.txt")):
+            stem = _book_id(toc)
+            if not toc.with_name(stem + ".txt").exists():
+                jobs.append(
+                    {
+                        "id": stem,
+                        "text": None,
+                        "toc": str(toc),
+                        "title": stem,
+                        "top_level": True,
+                    }
+                )
+        return jobs
+
+    with open(source, "r", encoding="utf-8") as f:
+        for line_num, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Manifest line {line_num} is not valid JSON: {e}")
+            if not isinstance(entry, dict):
+                raise ValueError(f"Manifest line {line_num} must be a JSON object")
+            if not entry.get("text") and not entry.get("toc"):
+                raise ValueError(
+                    f"Manifest line {line_num} must have a 'text' or 'toc' path"
+                )
+            paths = {
+                key: str(source.parent / entry[key]) if entry.get(key) else None
+                for key in ("text", "toc")
+            }
+            book_id = entry.get("id") or _book_id(paths["text"] or paths["toc"])
+            jobs.append(
+                {
+                    "id": str(book_id),
+                    **paths,
+                    "title": entry.get("title", book_id),
+                    "top_level": entry.get("top_level", True),
+                }
+            )
+
+    # Resuming is keyed on the ID, so a duplicate would be skipped after an interruption
+    seen = set()
+    for job in jobs:
+        if job["id"] in seen:
+            raise ValueError(f"Duplicate book ID '{job['id']}'")
+        seen.add(job["id"])
+    return jobs
+
+
+def section_to_dict(section) -> dict:
+    """
+    Convert a Section tree into nested dictionaries that can be serialized to JSON.
+    """
+    return {
+        "path": section._path,
+        "title": section.title,
+        "children": [section_to_dict(c) for c in section.children],
+    }
+
+
+def most_common(counts, top: int) -> list:
+    """
+    Convert a Counter into a JSON-friendly list of [key, count] pairs, joining n-gram tuples with spaces.
+    """
+    return [
+        [" ".join(key) if isinstance(key, tuple) else key, count]
+        for key, count in counts.most_common(top)
+    ]
+
+
+def run_job(job: dict, top: int = 50) -> dict:
+    """
+    Parse the table of contents and analyze the text of a single book.
+
+    Parameters
+    ----------
+    job: dict
+        Job as returned by discover_books
+    top: int
+        Number of most frequent letters, words, bigrams and trigrams to keep
+
+    Returns
+    -------
+    Dictionary of results for the book
+    """
+    result = {"id": job["id"], "title": job["title"], "bytes": 0}
+    if job.get("toc"):
+        from book_analysis.toc import read_toc
+
+        toc = read_toc(path=job["toc"], title=job["title"], top_level=job["top_level"])
+        result["toc_height"] = toc.height()
+        result["toc"] = section_to_dict(toc)
+        result["bytes"] += os.path.getsize(job["toc"])
+    if job.get("text"):
+        # Imported here so that TOC-only runs never load nltk
+        from book_analysis.nlp import analyze_text, load, sentence_metrics
+
+        # Read once and shared by both analyses
+        raw_text = load(job["text"])
+        analysis = analyze_text(raw_text)
+        for key, value in analysis.items():
+            result[key] = value if isinstance(value, int) else most_common(value, top)
+        metrics = sentence_metrics(raw_text)
+        metrics["sentence_length_distribution"] = {
+            str(k): v for k, v in sorted(metrics["sentence_length_distribution"].items())
+        }
+        result["sentence_metrics"] = metrics
+        result["bytes"] += os.path.getsize(job["text"])
+    return result
+
+
+def read_checkpoint(output: str) -> set[str]:
+    """
+    Read the IDs of the books already written to an output file.
+    A truncated final line (e.g. from an interrupted run) is ignored and will be redone.
+    """
+    done = set()
+    if not os.path.exists(output):
+        return done
+    with open(output, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["id"])
+            except (json.JSONDecodeError, KeyError):
+                continue
+    return done
+
+
+def _truncate_partial_line(output: str):
+    # Drops an incomplete trailing record so that appended records start on a new line
+    if not os.path.exists(output):
+        return
+    with open(output, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+
+def run_batch(
+    jobs: list[dict],
+    output: str,
+    workers: int = 1,
+    top: int = 50,
+    log=None,
+) -> int:
+    """
+    Run jobs in parallel, appending each result to a JSON Lines file as soon as it finishes.
+    Books already present in the output file are skipped, so interrupted runs can be resumed.
+
+    Parameters
+    ----------
+    jobs: list[dict]
+        Jobs as returned by discover_books
+    output: str
+        Path to the JSON Lines output file
+    workers: int
+        Number of worker processes. If 1, jobs are run in the current process.
+    top: int
+        Number of most frequent letters, words, bigrams and trigrams to keep
+    log
+        Stream to which progress and throughput are reported. Defaults to stderr.
+
+    Returns
+    -------
+    Number of failed jobs
+    """
+    if log is None:
+        log = sys.stderr
+    # Truncated first so that a record missing its newline is redone rather than counted
+    _truncate_partial_line(output)
+    done = read_checkpoint(output)
+    pending = [job for job in jobs if job["id"] not in done]
+    print(
+        f"{len(jobs)} books, {len(jobs) - len(pending)} already done, {len(pending)} to run",
+        file=log,
+    )
+
+    failures = 0
+    total_bytes = 0
+    start = time.perf_counter()
+    with open(output, "a", encoding="utf-8") as f:
+
+        def record(i: int, job: dict, result: dict | None, error: Exception | None):
+            nonlocal failures, total_bytes
+            elapsed = time.perf_counter() - start
+            if error is not None:
+                failures += 1
+                print(f"[{i}/{len(pending)}] {job['id']} failed: {error}", file=log)
+                return
+            f.write(json.dumps(result) + "\n")
+            # Flushed per book so that the output doubles as a checkpoint
+            f.flush()
+            total_bytes += result["bytes"]
+            print(
+                f"[{i}/{len(pending)}] {job['id']} "
+                f"({i / elapsed:.2f} books/s, {total_bytes / elapsed / 1e6:.2f} MB/s)",
+                file=log,
+            )
+
+        if workers == 1:
+            for i, job in enumerate(pending, start=1):
+                try:
+                    record(i, job, run_job(job, top), None)
+                except Exception as e:
+                    record(i, job, None, e)
+        else:
+            if any(job.get("text") for job in pending):
+                from book_analysis.nlp import english_stopwords
+
+                # Downloads the stopwords once here rather than concurrently in every worker.
+                # On failure the affected books fail one by one, as with a single worker.
+                try:
+                    english_stopwords()
+                except Exception as e:
+                    print(f"Could not load stopwords: {e}", file=log)
+            executor = ProcessPoolExecutor(max_workers=workers)
+            # Jobs are queued in a bounded window so an interrupt need not wait on the rest
+            queue = iter(pending)
+            futures = {}
+            i = 0
+            try:
+                while True:
+                    while len(futures) < 2 * workers:
+                        job = next(queue, None)
+                        if job is None:
+                            break
+                        futures[executor.submit(run_job, job, top)] = job
+                    if not futures:
+                        break
+                    finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        i += 1
+                        job = futures.pop(future)
+                        try:
+                            record(i, job, future.result(), None)
+                        except Exception as e:
+                            record(i, job, None, e)
+            except BaseException:
+                # Drops queued jobs instead of running them on e.g. KeyboardInterrupt
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+            executor.shutdown()
+    return failures
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    Entry point for the book-analysis command.
+    """
+    parser = argparse.ArgumentParser(
+        prog="book-analysis",
+        description="Parse tables of contents and analyze the text of a batch of books.",
+    )
+    parser.add_argument("source", help="Directory of TXT files or JSON Lines manifest")
+    parser.add_argument(
+        "-o", "--output", default="results.jsonl", help="JSON Lines output file"
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes",
+    )
+    parser.add_argument(
+        "--top", type=int, default=50, help="Number of most frequent n-grams to keep"
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        jobs = discover_books(args.source)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    try:
+        failures = run_batch(
+            jobs=jobs, output=args.output, workers=max(args.workers, 1), top=args.top
+        )
+    except KeyboardInterrupt:
+        print("Interrupted, rerun the same command to resume", file=sys.stderr)
+        return 130
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
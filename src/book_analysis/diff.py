@@ -0,0 +1,441 @@
+from __future__ import annotations
+from bisect import bisect_left
+from collections import deque
+import copy
+import hashlib
+from book_analysis.toc import Section
+from book_analysis.traversal import preorder_traversal
+
+
+class SectionChange:
+    """
+    A single edit between two table of contents trees.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        old_position: list[int] | None,
+        new_position: list[int] | None,
+        title: str,
+        new_title: str | None = None,
+        section: Section | None = None,
+    ):
+        """
+        Parameters
+        ----------
+        kind: str
+            Type of change
+            Valid enumerations:
+                "insert": A section (and its subsections) only exists in the new tree
+                "remove": A section (and its subsections) only exists in the old tree
+                "rename": A section's title changed
+                "move": A section changed position, either within or across parents
+                "renumber": A section's ID changed, e.g. a chapter shifted by an insertion
+        old_position: list[int] | None
+            Child indices from the root to the section in the old tree. None for insertions.
+        new_position: list[int] | None
+            Child indices from the root to the section in the new tree. None for removals.
+        title: str
+            Title of the section (in the old tree, if it exists there)
+        new_title: str | None
+            New title of a renamed section
+        section: Section | None
+            Removed section from the old tree, or the section from the new tree for every other kind.
+            Its numbering (ID and path) is carried over when the change is applied.
+        """
+        self.kind = kind
+        self.old_position = old_position
+        self.new_position = new_position
+        self.title = title
+        self.new_title = new_title
+        self.section = section
+
+    def __eq__(self, other):
+        if not isinstance(other, SectionChange):
+            return NotImplemented
+        return (
+            self.kind == other.kind
+            and self.old_position == other.old_position
+            and self.new_position == other.new_position
+            and self.title == other.title
+            and self.new_title == other.new_title
+        )
+
+    def __repr__(self):
+        if self.kind == "insert":
+            return f"insert {self.new_position} {self.title!r}"
+        if self.kind == "remove":
+            return f"remove {self.old_position} {self.title!r}"
+        if self.kind == "rename":
+            return f"rename {self.old_position} {self.title!r} -> {self.new_title!r}"
+        return f"{self.kind} {self.old_position} -> {self.new_position} {self.title!r}"
+
+
+def subtree_hashes(toc: Section) -> dict[int, bytes]:
+    """
+    Hash every subtree of a table of contents.
+    Two subtrees have the same hash if their titles and the titles, IDs and order of all their subsections are identical.
+    The ID of the subtree's own root is left out so that a renumbered section can still be matched.
+
+    Parameters
+    ----------
+    toc: Section
+        Root of the table of contents
+
+    Returns
+    -------
+    Dictionary mapping id() of each Section to the hash of the subtree rooted there
+    """
+    hashes = {}
+
+    def visit(section):
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(section.title.encode("utf-8"))
+        for child in section.children:
+            # Separator prevents ambiguity between titles and child hashes
+            digest.update(b"\x00")
+            digest.update(str(child.id).encode("utf-8"))
+            digest.update(b"\x00")
+            digest.update(visit(child))
+        hashes[id(section)] = digest.digest()
+        return hashes[id(section)]
+
+    visit(toc)
+    return hashes
+
+
+def _increasing_subsequence(values: list[int]) -> set[int]:
+    # Indices of a longest strictly increasing subsequence of values, in O(n log n)
+    tails = []
+    tail_indices = []
+    previous = [None] * len(values)
+    for i, value in enumerate(values):
+        k = bisect_left(tails, value)
+        if k == len(tails):
+            tails.append(value)
+            tail_indices.append(i)
+        else:
+            tails[k] = value
+            tail_indices[k] = i
+        previous[i] = tail_indices[k - 1] if k > 0 else None
+
+    result = set()
+    i = tail_indices[-1] if tail_indices else None
+    while i is not None:
+        result.add(i)
+        i = previous[i]
+    return result
+
+
+def _match_children(
+    old_children, new_children, key_old, key_new, pairs, old_matched, new_matched
+):
+    # Pairs unmatched children with equal keys, first occurrence with first occurrence
+    candidates = {}
+    for i, section in enumerate(old_children):
+        if not old_matched[i]:
+            candidates.setdefault(key_old(section), deque()).append(i)
+    for j, section in enumerate(new_children):
+        if new_matched[j]:
+            continue
+        matches = candidates.get(key_new(section))
+        if matches:
+            i = matches.popleft()
+            pairs.append((i, j))
+            old_matched[i] = new_matched[j] = True
+
+
+def _similar(old: Section, new: Section) -> bool:
+    # Two leaves, or two sections sharing at least one subsection title
+    if not old.children and not new.children:
+        return True
+    return not {s.title for s in old.children}.isdisjoint(
+        s.title for s in new.children
+    )
+
+
+def _diff_children(
+    old, new, old_position, new_position, old_hashes, new_hashes, changes
+):
+    old_children, new_children = old.children, new.children
+    old_matched = [False] * len(old_children)
+    new_matched = [False] * len(new_children)
+    pairs = []
+
+    # Match identical subtrees first, then equal titles, then the rest by position
+    _match_children(
+        old_children,
+        new_children,
+        lambda s: old_hashes[id(s)],
+        lambda s: new_hashes[id(s)],
+        pairs,
+        old_matched,
+        new_matched,
+    )
+    _match_children(
+        old_children,
+        new_children,
+        lambda s: s.title,
+        lambda s: s.title,
+        pairs,
+        old_matched,
+        new_matched,
+    )
+    # Leftovers at the same relative position are only paired if they look alike,
+    # otherwise they are reported as a removal and an insertion (which may become a move)
+    for i, j in zip(
+        [i for i, matched in enumerate(old_matched) if not matched],
+        [j for j, matched in enumerate(new_matched) if not matched],
+    ):
+        if _similar(old_children[i], new_children[j]):
+            pairs.append((i, j))
+            old_matched[i] = new_matched[j] = True
+    old_left = [i for i, matched in enumerate(old_matched) if not matched]
+    new_left = [j for j, matched in enumerate(new_matched) if not matched]
+
+    # Sections outside the longest run that keeps its relative order have moved
+    pairs.sort()
+    in_order = _increasing_subsequence([j for _, j in pairs])
+
+    for i in old_left:
+        changes.append(
+            SectionChange(
+                kind="remove",
+                old_position=old_position + [i],
+                new_position=None,
+                title=old_children[i].title,
+                section=old_children[i],
+            )
+        )
+    for k, (i, j) in enumerate(pairs):
+        old_child, new_child = old_children[i], new_children[j]
+        moved = k not in in_order
+        renamed = old_child.title != new_child.title
+        if moved:
+            changes.append(
+                SectionChange(
+                    kind="move",
+                    old_position=old_position + [i],
+                    new_position=new_position + [j],
+                    title=old_child.title,
+                    section=new_child,
+                )
+            )
+        if renamed:
+            changes.append(
+                SectionChange(
+                    kind="rename",
+                    old_position=old_position + [i],
+                    new_position=new_position + [j],
+                    title=old_child.title,
+                    new_title=new_child.title,
+                    section=new_child,
+                )
+            )
+        # Moves and renames already carry the new numbering
+        if old_child.id != new_child.id and not moved and not renamed:
+            changes.append(
+                SectionChange(
+                    kind="renumber",
+                    old_position=old_position + [i],
+                    new_position=new_position + [j],
+                    title=old_child.title,
+                    section=new_child,
+                )
+            )
+        # Identical subtrees are skipped entirely
+        if old_hashes[id(old_child)] == new_hashes[id(new_child)]:
+            continue
+        _diff_children(
+            old_child,
+            new_child,
+            old_position + [i],
+            new_position + [j],
+            old_hashes,
+            new_hashes,
+            changes,
+        )
+    for j in new_left:
+        changes.append(
+            SectionChange(
+                kind="insert",
+                old_position=None,
+                new_position=new_position + [j],
+                title=new_children[j].title,
+                section=new_children[j],
+            )
+        )
+
+
+def _detect_moves(changes, old_hashes, new_hashes):
+    # Replaces a removal and an insertion of identical subtrees with a single move
+    removed = {}
+    for change in changes:
+        if change.kind == "remove":
+            removed.setdefault(old_hashes[id(change.section)], deque()).append(change)
+
+    result = []
+    moved = set()
+    for change in changes:
+        if change.kind == "insert" and removed.get(new_hashes[id(change.section)]):
+            source = removed[new_hashes[id(change.section)]].popleft()
+            moved.add(id(source))
+            change = SectionChange(
+                kind="move",
+                old_position=source.old_position,
+                new_position=change.new_position,
+                title=change.title,
+                section=change.section,
+            )
+        result.append(change)
+    return [c for c in result if id(c) not in moved]
+
+
+def diff_toc(
+    old: Section,
+    new: Section,
+    old_hashes: dict[int, bytes] | None = None,
+    new_hashes: dict[int, bytes] | None = None,
+) -> list[SectionChange]:
+    """
+    Find the changes needed to turn one table of contents into another.
+    Identical subtrees are skipped using their hashes, so the comparison only descends into changed sections.
+    Hashing a tree is O(n), so when a tree is compared more than once (e.g. against several editions),
+    hash it once with subtree_hashes and pass the result in. Diffing then costs O(changed).
+    Changes of section IDs are reported so that applying the changes reproduces the new tree's numbering.
+
+    Parameters
+    ----------
+    old: Section
+        Root of the original table of contents
+    new: Section
+        Root of the revised table of contents
+    old_hashes: dict[int, bytes] | None
+        Precomputed subtree_hashes of the old tree. Computed if not given.
+        Must be recomputed after the tree is modified.
+    new_hashes: dict[int, bytes] | None
+        Precomputed subtree_hashes of the new tree. Computed if not given.
+        Must be recomputed after the tree is modified.
+
+    Returns
+    -------
+    List of SectionChange objects
+    """
+    if old_hashes is None:
+        old_hashes = subtree_hashes(old)
+    if new_hashes is None:
+        new_hashes = subtree_hashes(new)
+    changes = []
+    if old_hashes[id(old)] == new_hashes[id(new)] and old.id == new.id:
+        return changes
+    if old.title != new.title:
+        changes.append(
+            SectionChange(
+                kind="rename",
+                old_position=[],
+                new_position=[],
+                title=old.title,
+                new_title=new.title,
+                section=new,
+            )
+        )
+    elif old.id != new.id:
+        changes.append(
+            SectionChange(
+                kind="renumber",
+                old_position=[],
+                new_position=[],
+                title=old.title,
+                section=new,
+            )
+        )
+    _diff_children(old, new, [], [], old_hashes, new_hashes, changes)
+    return _detect_moves(changes, old_hashes, new_hashes)
+
+
+def _resolve(toc: Section, position: list[int]) -> Section:
+    section = toc
+    for idx in position:
+        if not 0 <= idx < len(section.children):
+            raise IndexError(f"Invalid position {position}")
+        section = section.children[idx]
+    return section
+
+
+def _renumber(section: Section, numbered: Section):
+    # Copies the numbering from the new tree and shifts the paths of its subsections
+    old_path, old_depth = section._path, section._depth
+    section._id = numbered.id
+    section._path = list(numbered._path)
+    section._depth = numbered._depth
+    for child in preorder_traversal(section)[1:]:
+        child._path = section._path + child._path[len(old_path) :]
+        child._depth += section._depth - old_depth
+
+
+def apply_diff(toc: Section, changes: list[SectionChange]) -> Section:
+    """
+    Apply changes found by diff_toc to a table of contents.
+    The original table of contents is left unmodified.
+
+    Parameters
+    ----------
+    toc: Section
+        Root of the original table of contents
+    changes: list[SectionChange]
+        Changes to apply
+
+    Returns
+    -------
+    Root Section object of the revised table of contents
+    """
+    toc = copy.deepcopy(toc)
+
+    # Look up every section referenced in the old tree before anything is modified
+    sources = {}
+    parents = {}
+    for change in changes:
+        if change.old_position is not None:
+            sources[id(change)] = _resolve(toc, change.old_position)
+        if change.kind in ("remove", "move"):
+            if not change.old_position:
+                raise IndexError("The root section cannot be removed or moved")
+            parents[id(change)] = _resolve(toc, change.old_position[:-1])
+
+    for change in changes:
+        if change.kind == "rename":
+            sources[id(change)].title = change.new_title
+
+    # Detach removed and moved sections, filtering each parent's children once
+    detached = {}
+    for change in changes:
+        if change.kind in ("remove", "move"):
+            parent = parents[id(change)]
+            detached.setdefault(id(parent), (parent, set()))[1].add(
+                id(sources[id(change)])
+            )
+    for parent, ids in detached.values():
+        parent.children = [s for s in parent.children if id(s) not in ids]
+
+    # Renumber before attaching so that inserted sections keep their own numbering.
+    # In order of position, ancestors are renumbered before their subsections.
+    renumbered = [c for c in changes if c.kind in ("rename", "move", "renumber")]
+    for change in sorted(renumbered, key=lambda c: c.new_position):
+        _renumber(sources[id(change)], change.section)
+
+    # Attaching in order of position means every preceding section is already in place
+    attached = [c for c in changes if c.kind in ("insert", "move")]
+    for change in sorted(attached, key=lambda c: c.new_position):
+        if not change.new_position:
+            raise IndexError("The root section cannot be inserted or moved")
+        parent = _resolve(toc, change.new_position[:-1])
+        idx = change.new_position[-1]
+        if idx > len(parent.children):
+            raise IndexError(f"Invalid position {change.new_position}")
+        if change.kind == "insert":
+            section = copy.deepcopy(change.section)
+        else:
+            section = sources[id(change)]
+        parent.children.insert(idx, section)
+    return toc
@@ -1,13 +1,30 @@
 from collections import Counter
-from nltk.corpus import stopwords
-import nltk
+from functools import lru_cache
 import re
 
-nltk.download("stopwords")
+
+@lru_cache(maxsize=None)
+def english_stopwords() -> frozenset[str]:
+    """
+    Load the English stopwords from nltk, downloading them if needed.
+    NOTE: nltk is imported here rather than at module level since it is slow to import.
+
+    Returns
+    -------
+    Set of English stopwords
+    """
+    import nltk
+    from nltk.corpus import stopwords
+
+    try:
+        return frozenset(stopwords.words("english"))
+    except LookupError:
+        nltk.download("stopwords")
+        return frozenset(stopwords.words("english"))
 
 
 def preprocess_text(text):
-    stop_words = set(stopwords.words("english"))
+    stop_words = english_stopwords()
     text = text.lower()
     text = text.replace("’", "'")
     text = re.sub(r"'s\b", "", text)
@@ -75,9 +92,8 @@ def load(filepath):
     return text
 
 
-def analyze_book(filepath):
+def analyze_text(raw_text):
 
-    raw_text = load(filepath)
     filtered_tokens = preprocess_text(raw_text)
 
     results = {
@@ -90,3 +106,8 @@ def analyze_book(filepath):
         "trigram_freq": trigram_frequency(filtered_tokens),
     }
     return results
+
+
+def analyze_book(filepath):
+
+    return analyze_text(load(filepath))
@@ -35,14 +35,18 @@ class Section:
 
     def __eq__(self, other):
         """
-        Define equality between two Section objects as two sections with identical titles.
-        NOTE: This does not hold well with certain cases, like with identical titles at different levels within a table of contents!
+        Define equality between two Section objects as two sections with identical titles and identical subsections.
+        NOTE: Section numbering (IDs and paths) is not compared.
         """
         if not isinstance(other, Section):
             raise TypeError(
                 f"Equality cannot be established between types {Section} and {type(other)}"
             )
-        return self.title == other.title
+        return (
+            self.title == other.title
+            and len(self.children) == len(other.children)
+            and all(a == b for a, b in zip(self.children, other.children))
+        )
 
     def __repr__(self):
         if self.id is None:
@@ -0,0 +1,166 @@
+import io
+import json
+
+import pytest
+from book_analysis.cli import discover_books, read_checkpoint, run_batch, main
+
+TOC_LINES = [
+    "Part I: Part One",
+    "   Chapter 1  Part One Chapter One",
+    "     1.1 Part One Chapter One Section One",
+    "Part II: Part Two",
+]
+
+
+def read_output(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_discover_books(tmp_path):
+    (tmp_path / "book_a.txt").write_text("Some text.")
+    (tmp_path / "book_a.toc.txt").write_text("\n".join(TOC_LINES))
+    (tmp_path / "book_b.txt").write_text("More text.")
+    (tmp_path / "book_c.toc.txt").write_text("\n".join(TOC_LINES))
+
+    # Directory
+    jobs = discover_books(tmp_path)
+    assert [j["id"] for j in jobs] == ["book_a", "book_b", "book_c"]
+    assert jobs[0]["toc"] == str(tmp_path / "book_a.toc.txt")
+    assert jobs[1]["toc"] is None
+    assert jobs[2]["text"] is None
+
+    # Manifest
+    manifest = tmp_path / "manifest.jsonl"
+    manifest.write_text(
+        '{"id": "a", "text": "book_a.txt", "toc": "book_a.toc.txt", "title": "A"}\n'
+        "\n"
+        '{"toc": "book_c.toc.txt", "top_level": false}\n'
+    )
+    jobs = discover_books(manifest)
+    assert [j["id"] for j in jobs] == ["a", "book_c"]
+    assert jobs[0]["text"] == str(tmp_path / "book_a.txt")
+    assert jobs[0]["title"] == "A"
+    assert jobs[1]["text"] is None
+    assert jobs[1]["top_level"] is False
+
+    # Invalid manifest
+    manifest.write_text('{"id": "a"}\n')
+    with pytest.raises(ValueError) as exception:
+        discover_books(manifest)
+    assert "Manifest line 1 must have a 'text' or 'toc' path" == str(exception.value)
+
+    # Malformed lines
+    for line, message in [
+        ("{", "Manifest line 1 is not valid JSON"),
+        ('["a.txt"]', "Manifest line 1 must be a JSON object"),
+    ]:
+        manifest.write_text(line + "\n")
+        with pytest.raises(ValueError) as exception:
+            discover_books(manifest)
+        assert str(exception.value).startswith(message)
+
+    # Duplicate IDs
+    manifest.write_text('{"toc": "v1/book.toc.txt"}\n{"toc": "v2/book.toc.txt"}\n')
+    with pytest.raises(ValueError) as exception:
+        discover_books(manifest)
+    assert "Duplicate book ID 'book'" == str(exception.value)
+
+
+def test_run_batch_resumes(tmp_path):
+    for name in ["a", "b", "c"]:
+        (tmp_path / f"{name}.toc.txt").write_text("\n".join(TOC_LINES))
+    output = tmp_path / "results.jsonl"
+    jobs = discover_books(tmp_path)
+
+    # Simulate an interrupted run: one finished book and a truncated record
+    output.write_text('{"id": "a", "title": "a"}\n{"id": "b", "ti')
+    assert read_checkpoint(output) == {"a"}
+
+    log = io.StringIO()
+    assert run_batch(jobs=jobs, output=output, workers=1, log=log) == 0
+    assert "3 books, 1 already done, 2 to run" in log.getvalue()
+    results = read_output(output)
+    assert [r["id"] for r in results] == ["a", "b", "c"]
+    assert results[1]["toc_height"] == 3
+    assert [c["title"] for c in results[1]["toc"]["children"]] == [
+        "Part One",
+        "Part Two",
+    ]
+
+    # Nothing is redone once every book is finished
+    log = io.StringIO()
+    assert run_batch(jobs=jobs, output=output, workers=2, log=log) == 0
+    assert "3 books, 3 already done, 0 to run" in log.getvalue()
+    assert len(read_output(output)) == 3
+
+    # A complete record missing its trailing newline is redone
+    output.write_text(output.read_text().rstrip("\n"))
+    log = io.StringIO()
+    assert run_batch(jobs=jobs, output=output, workers=1, log=log) == 0
+    assert "3 books, 2 already done, 1 to run" in log.getvalue()
+    assert [r["id"] for r in read_output(output)] == ["a", "b", "c"]
+
+
+def test_run_batch_failures(tmp_path):
+    jobs = [
+        {"id": "missing", "text": None, "toc": str(tmp_path / "x"), "title": "x"},
+    ]
+    output = tmp_path / "results.jsonl"
+    log = io.StringIO()
+    assert run_batch(jobs=jobs, output=output, workers=1, log=log) == 1
+    assert "missing failed" in log.getvalue()
+    assert output.read_text() == ""
+
+
+def test_run_batch_stopwords_failure(tmp_path, monkeypatch):
+    import book_analysis.nlp
+
+    def fail():
+        raise LookupError("stopwords not found")
+
+    monkeypatch.setattr(book_analysis.nlp, "english_stopwords", fail)
+    (tmp_path / "a.toc.txt").write_text("\n".join(TOC_LINES))
+    # Books that need stopwords fail on their own, the rest are still written
+    jobs = discover_books(tmp_path) + [
+        {"id": "b", "text": str(tmp_path / "b.txt"), "toc": None, "title": "b"},
+    ]
+    output = tmp_path / "results.jsonl"
+    log = io.StringIO()
+    assert run_batch(jobs=jobs, output=output, workers=2, log=log) == 1
+    assert "Could not load stopwords: stopwords not found" in log.getvalue()
+    assert [r["id"] for r in read_output(output)] == ["a"]
+
+
+def test_main(tmp_path, capsys):
+    for name in ["a", "b"]:
+        (tmp_path / f"{name}.toc.txt").write_text("\n".join(TOC_LINES))
+    output = tmp_path / "results.jsonl"
+    assert main([str(tmp_path), "-o", str(output), "-j", "2"]) == 0
+    assert sorted(r["id"] for r in read_output(output)) == ["a", "b"]
+    assert "books/s" in capsys.readouterr().err
+
+
+def test_main_invalid_source(tmp_path, capsys):
+    # Missing source
+    with pytest.raises(SystemExit) as exception:
+        main([str(tmp_path / "missing.jsonl")])
+    assert exception.value.code == 2
+    assert "No such file or directory" in capsys.readouterr().err
+
+    # Invalid manifest
+    manifest = tmp_path / "manifest.jsonl"
+    manifest.write_text('{"id": "a"}\n')
+    with pytest.raises(SystemExit) as exception:
+        main([str(manifest)])
+    assert exception.value.code == 2
+    assert "Manifest line 1 must have a 'text' or 'toc' path" in capsys.readouterr().err
+
+
+def test_main_analyze_book(tmp_path):
+    pytest.importorskip("nltk")
+    (tmp_path / "book.txt").write_text("The cat sat. The cat ran!")
+    output = tmp_path / "results.jsonl"
+    assert main([str(tmp_path), "-o", str(output), "-j", "1", "--top", "1"]) == 0
+    result = read_output(output)[0]
+    assert result["word_freq"] == [["cat", 2]]
+    assert result["sentence_metrics"]["num_sentences"] == 2
@@ -0,0 +1,244 @@
+import random
+from pathlib import Path
+
+import pytest
+from book_analysis.diff import SectionChange, apply_diff, diff_toc, subtree_hashes
+from book_analysis.toc import Section, construct_toc, read_toc
+from book_analysis.traversal import preorder_traversal
+
+DATA = Path(__file__).parent.parent / "data"
+
+TOC_LINES = [
+    "Part I: Part One",
+    "   Chapter 1  Intro",
+    "     1.1 Overview",
+    "     1.2 Summary",
+    "   Chapter 2  Search",
+    "     2.1 Overview",
+    "     2.2 Summary",
+    "Part II: Part Two",
+    "   Chapter 3  Learning",
+    "     3.1 Overview",
+]
+
+
+def build(lines):
+    return construct_toc(lines=lines, title="Book")
+
+
+def get_paths(toc):
+    return [s._path for s in preorder_traversal(toc)]
+
+
+def test_Section_equality():
+    toc = build(TOC_LINES)
+    assert toc == build(TOC_LINES)
+    # Duplicate titles with different subsections are not equal
+    intro, search = toc.children[0].children
+    assert intro.children[0].title == search.children[0].title
+    assert intro != search
+    assert Section(title="Overview", children=[]) == intro.children[0]
+    assert toc != build(TOC_LINES[:-1])
+
+
+def test_subtree_hashes():
+    toc = build(TOC_LINES)
+    hashes = subtree_hashes(toc)
+    part_one, part_two = toc.children
+    # Same title, same subsections
+    assert hashes[id(part_one.children[0].children[0])] == hashes[
+        id(part_two.children[0].children[0])
+    ]
+    # Same title, different subsections
+    other = build(TOC_LINES[:-1])
+    assert hashes[id(part_two)] != subtree_hashes(other)[id(other.children[1])]
+
+
+def test_diff_toc():
+    old = build(TOC_LINES)
+
+    # Identical
+    assert diff_toc(old, build(TOC_LINES)) == []
+
+    # Rename
+    new = build([l.replace("Search", "Searching") for l in TOC_LINES])
+    assert diff_toc(old, new) == [
+        SectionChange("rename", [0, 1], [0, 1], "Search", new_title="Searching")
+    ]
+
+    # Insert and remove
+    new = build(TOC_LINES[:4] + ["     1.3 Exercises"] + TOC_LINES[4:8])
+    assert diff_toc(old, new) == [
+        SectionChange("insert", None, [0, 0, 2], "Exercises"),
+        SectionChange("remove", [1, 0], None, "Learning"),
+    ]
+
+    # Unmatched sections at the same position are renamed if they look alike
+    new = build(TOC_LINES[:3] + ["     1.2 Exercises"] + TOC_LINES[4:])
+    assert diff_toc(old, new) == [
+        SectionChange("rename", [0, 0, 1], [0, 0, 1], "Summary", new_title="Exercises")
+    ]
+    new = build(
+        TOC_LINES[:4]
+        + ["   Chapter 2  Planning", "     2.1 Agents", "     2.2 Exercises"]
+        + TOC_LINES[7:]
+    )
+    assert diff_toc(old, new) == [
+        SectionChange("remove", [0, 1], None, "Search"),
+        SectionChange("insert", None, [0, 1], "Planning"),
+    ]
+
+    # Move within a parent
+    new = build(TOC_LINES)
+    new.children[0].children.reverse()
+    assert diff_toc(old, new) == [SectionChange("move", [0, 0], [0, 1], "Intro")]
+
+    # Move across parents
+    new = build(TOC_LINES)
+    new.children[1].children.append(new.children[0].children.pop(1))
+    assert diff_toc(old, new) == [SectionChange("move", [0, 1], [1, 1], "Search")]
+
+    # Chapters shifted by an insertion are renumbered
+    new = build(
+        TOC_LINES[:4]
+        + [
+            "   Chapter 2  New",
+            "   Chapter 3  Search",
+            "     3.1 Overview",
+            "     3.2 Summary",
+            "Part II: Part Two",
+            "   Chapter 4  Learning",
+            "     4.1 Overview",
+        ]
+    )
+    assert diff_toc(old, new) == [
+        SectionChange("renumber", [0, 1], [0, 2], "Search"),
+        SectionChange("insert", None, [0, 1], "New"),
+        SectionChange("renumber", [1, 0], [1, 0], "Learning"),
+    ]
+
+    # Duplicate titles are matched in order
+    new = build(TOC_LINES[:5] + TOC_LINES[6:])
+    assert diff_toc(old, new) == [SectionChange("remove", [0, 1, 0], None, "Overview")]
+
+
+class CountingSection(Section):
+    """
+    Section that counts how often its children are read.
+    """
+
+    reads = 0
+
+    @property
+    def children(self):
+        CountingSection.reads += 1
+        return self._children
+
+    @children.setter
+    def children(self, value):
+        self._children = value
+
+
+def test_diff_toc_precomputed_hashes():
+    def counting_toc(prefix):
+        return Section(
+            title="Book",
+            children=[
+                Section(title=prefix, children=[]),
+                CountingSection(
+                    title="Part",
+                    children=[
+                        CountingSection(title=f"Chapter {i}", children=[])
+                        for i in range(100)
+                    ],
+                ),
+            ],
+        )
+
+    old, new = counting_toc("Preface"), counting_toc("Foreword")
+    old_hashes, new_hashes = subtree_hashes(old), subtree_hashes(new)
+
+    # The identical subtree is never walked once the hashes are known
+    CountingSection.reads = 0
+    changes = diff_toc(old, new, old_hashes=old_hashes, new_hashes=new_hashes)
+    assert changes == [SectionChange("rename", [0], [0], "Preface", new_title="Foreword")]
+    assert CountingSection.reads == 0
+
+    # Hashes can be reused across comparisons
+    assert diff_toc(old, old, old_hashes=old_hashes, new_hashes=old_hashes) == []
+    assert CountingSection.reads == 0
+
+
+def test_apply_diff():
+    old = build(TOC_LINES)
+    new = build(
+        [
+            "Part I: Part One",
+            "   Chapter 1  Search",
+            "     1.1 Overview",
+            "     1.2 Summary",
+            "   Chapter 2  Introduction",
+            "     2.1 Overview",
+            "     2.2 History",
+            "     2.3 Summary",
+            "Part II: Part Two",
+            "Part III: Part Three",
+            "   Chapter 3  Learning",
+            "     3.1 Overview",
+            "     3.2 Exercises",
+        ]
+    )
+    patched = apply_diff(old, diff_toc(old, new))
+    assert patched == new
+    assert get_paths(patched) == get_paths(new)
+    # The original tree is left unmodified
+    assert old == build(TOC_LINES)
+
+    with pytest.raises(IndexError) as exception:
+        apply_diff(old, [SectionChange("remove", [5], None, "Missing")])
+    assert "Invalid position [5]" == str(exception.value)
+
+
+def test_apply_diff_numbering():
+    old = read_toc(DATA / "artificial_intelligence_a_modern_approach.txt")
+    # Chapters are numbered across parts, so numbering differs from position
+    assert old.children[1].children[0]._path == [2, 3]
+    assert get_paths(apply_diff(old, [])) == get_paths(old)
+
+    # Rename in Part I
+    new = read_toc(DATA / "artificial_intelligence_a_modern_approach.txt")
+    new.children[0].children[0].title = "Introduction to AI"
+    patched = apply_diff(old, diff_toc(old, new))
+    assert patched == new
+    assert get_paths(patched) == get_paths(new)
+
+    # Remove Part I, and the reverse
+    new.children.pop(0)
+    for a, b in [(old, new), (new, old)]:
+        patched = apply_diff(a, diff_toc(a, b))
+        assert patched == b
+        assert get_paths(patched) == get_paths(b)
+
+
+def random_toc(rng, titles, path=[], depth=0):
+    section = Section(title=rng.choice(titles), children=[])
+    section._path = path
+    section._depth = depth
+    if path:
+        section.id = path[-1]
+    if depth < 3:
+        for _ in range(rng.randint(0, 4)):
+            child_path = path + [rng.randint(1, 3)]
+            section.children.append(random_toc(rng, titles, child_path, depth + 1))
+    return section
+
+
+def test_apply_diff_random():
+    rng = random.Random(0)
+    titles = ["A", "B", "C", "D", "E"]
+    for _ in range(200):
+        old = random_toc(rng, titles)
+        new = random_toc(rng, titles)
+        patched = apply_diff(old, diff_toc(old, new))
+        assert patched == new
+        assert get_paths(patched) == get_paths(new)
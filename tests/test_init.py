@@ -0,0 +1,42 @@
+import subprocess
+import sys
+
+import pytest
+
+
+def imported_modules(statement):
+    # Run in a fresh interpreter so that modules imported by other tests do not leak in
+    code = f"import sys\n{statement}\nprint('\\n'.join(sys.modules))"
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    return set(output.split())
+
+
+@pytest.mark.parametrize(
+    "statement",
+    [
+        "import book_analysis",
+        "from book_analysis import read_toc",
+        "import book_analysis.toc",
+    ],
+)
+def test_import_does_not_load_nltk(statement):
+    modules = imported_modules(statement)
+    assert "nltk" not in modules
+    assert "book_analysis.nlp" not in modules
+
+
+def test_lazy_attributes():
+    import book_analysis
+    from book_analysis.toc import read_toc
+
+    assert book_analysis.read_toc is read_toc
+    assert "read_toc" in dir(book_analysis)
+    assert "nlp" in dir(book_analysis)
+
+    with pytest.raises(AttributeError) as exception:
+        book_analysis.does_not_exist
+    assert "module 'book_analysis' has no attribute 'does_not_exist'" == str(
+        exception.value
+    )
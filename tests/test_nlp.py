@@ -46,3 +46,11 @@ def test_trigram():
         ("test", "this", "is"): 1,
     }
     assert freq == expected
+
+
+def test_analyze_text():
+    text = "The cat sat. The cat ran!"
+    results = analyze_text(text)
+    assert results["total_chars"] == len(text)
+    assert results["total_tokens_before"] == 6
+    assert results["word_freq"] == {"cat": 2, "sat": 1, "ran": 1}